@@ -7,8 +7,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-from datetime import datetime, timedelta
+import duckdb
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import qualitative
+
+pio.json.config.default_engine = "orjson"
 
 st.set_page_config(
     page_title="QA Call Center Dashboard",
@@ -16,9 +20,9 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data
-def load_data():
-    np.random.seed(42)
+@st.cache_resource
+def _load_raw():
+    rng = np.random.default_rng(42)
     n = 600
 
     agentes = {
@@ -35,49 +39,51 @@ def load_data():
     categorias = ["Venta Nueva", "Renovacion", "Queja", "Soporte Tecnico", "Cancelacion"]
     turnos = ["Manana", "Tarde", "Noche"]
 
-    fecha_inicio = datetime(2024, 1, 1)
-    fechas = [fecha_inicio + timedelta(days=int(np.random.randint(0, 365))) for _ in range(n)]
-    dia_semana = [f.weekday() for f in fechas]
-    mes = [f.month for f in fechas]
+    offsets = rng.integers(0, 365, n)
+    fechas = pd.to_datetime("2024-01-01") + pd.to_timedelta(offsets, unit="D")
+    dia_semana = fechas.dayofweek.values
+    mes = fechas.month.values
 
-    ids_agentes = np.random.choice(list(agentes.keys()), n)
-    nombres_agentes = [agentes[a]["nombre"] for a in ids_agentes]
-    experiencia = [agentes[a]["experiencia_meses"] for a in ids_agentes]
-    turno_asignado = np.random.choice(turnos, n, p=[0.45, 0.40, 0.15])
+    tabla_agentes = pd.DataFrame.from_dict(agentes, orient="index")
+    ids_agentes = rng.choice(list(agentes.keys()), n)
+    nombres_agentes = tabla_agentes.loc[ids_agentes, "nombre"].values
+    experiencia = tabla_agentes.loc[ids_agentes, "experiencia_meses"].values
+    turno_asignado = rng.choice(turnos, n, p=[0.45, 0.40, 0.15])
 
-    llamadas_base = np.random.randint(10, 30, n)
-    bonus_dia = np.where(np.isin(dia_semana, [0, 4]), np.random.randint(4, 9, n), 0)
-    bonus_dic = np.where(np.array(mes) == 12, np.random.randint(3, 7, n), 0)
+    llamadas_base = rng.integers(10, 30, n)
+    bonus_dia = np.where(np.isin(dia_semana, [0, 4]), rng.integers(4, 9, n), 0)
+    bonus_dic = np.where(np.array(mes) == 12, rng.integers(3, 7, n), 0)
     llamadas_por_turno = llamadas_base + bonus_dia + bonus_dic
 
-    categoria_llamada = np.random.choice(categorias, n, p=[0.30, 0.25, 0.15, 0.20, 0.10])
-    duracion_base = np.random.normal(8, 2, n)
-    bonus_cancelacion = np.where(categoria_llamada == "Cancelacion", np.random.uniform(5, 10, n), 0)
+    categoria_llamada = rng.choice(categorias, n, p=[0.30, 0.25, 0.15, 0.20, 0.10])
+    duracion_base = rng.normal(8, 2, n)
+    bonus_cancelacion = np.where(categoria_llamada == "Cancelacion", rng.uniform(5, 10, n), 0)
     duracion_promedio = np.clip(duracion_base + bonus_cancelacion, 3, 25).round(1)
 
     score_base = 5 + (duracion_promedio * 0.15) + (np.array(experiencia) * 0.03)
-    ruido = np.random.normal(0, 0.8, n)
+    ruido = rng.normal(0, 0.8, n)
     pen_sat = np.where(llamadas_por_turno > 25, -1.2, 0)
     pen_can = np.where(categoria_llamada == "Cancelacion", -1.5, 0)
     pen_noche = np.where((np.array(turno_asignado) == "Noche") & (np.array(mes) == 3), -2.0, 0)
     score_satisfaccion = np.clip(score_base + ruido + pen_sat + pen_can + pen_noche, 1, 10).round(1)
 
-    score_qa_base = 60 + (np.array(experiencia) * 0.5) + np.random.normal(0, 8, n)
+    score_qa_base = 60 + (np.array(experiencia) * 0.5) + rng.normal(0, 8, n)
     pen_qa = np.where(llamadas_por_turno > 25, -8, 0)
     score_qa = np.clip(score_qa_base + pen_qa, 40, 100).round(1)
 
-    tasa_base = np.clip(20 - (np.array(experiencia) * 0.2) + np.random.normal(0, 3, n), 2, 40)
+    tasa_base = np.clip(20 - (np.array(experiencia) * 0.2) + rng.normal(0, 3, n), 2, 40)
     tasa_error = np.where(ids_agentes == "AG04", tasa_base * 1.8, tasa_base).round(1)
 
     prob_res = np.clip(0.4 + (np.array(experiencia) * 0.01), 0.4, 0.85)
-    resolucion = [np.random.choice(["Si", "No"], p=[p, 1-p]) for p in prob_res]
+    resolucion = np.where(rng.random(n) < prob_res, "Si", "No")
 
     dias_nombres = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"]
+    meses_nombres = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
 
     df = pd.DataFrame({
-        "fecha":                 [f.strftime("%Y-%m-%d") for f in fechas],
+        "fecha":                 fechas,
         "mes":                   mes,
-        "dia_semana":            [dias_nombres[d] for d in dia_semana],
+        "dia_semana":            np.array(dias_nombres)[dia_semana],
         "id_agente":             ids_agentes,
         "nombre_agente":         nombres_agentes,
         "experiencia_meses":     experiencia,
@@ -90,10 +96,100 @@ def load_data():
         "tasa_error_pct":        tasa_error,
         "resolucion_primera":    resolucion,
     })
-    df["fecha"] = pd.to_datetime(df["fecha"])
+    df = df.astype({
+        "mes":                   "int8",
+        "experiencia_meses":     "int8",
+        "llamadas_por_turno":    "int16",
+        "duracion_promedio_min": "float32",
+        "score_satisfaccion":    "float32",
+        "score_qa":              "float32",
+        "tasa_error_pct":        "float32",
+        "id_agente":             "category",
+        "nombre_agente":         "category",
+        "turno":                 "category",
+        "categoria_llamada":     "category",
+        "dia_semana":            pd.CategoricalDtype(dias_nombres, ordered=True),
+        "resolucion_primera":    "category",
+    })
+    df["mes_nombre"] = pd.Categorical.from_codes(df["mes"].values - 1, categories=meses_nombres, ordered=True)
     return df
 
+@st.cache_data
+def load_data():
+    return _load_raw()
+
+@st.cache_resource
+def _conexion():
+    con = duckdb.connect()
+    con.register("calls_df", _load_raw())
+    con.execute("CREATE TABLE calls AS SELECT * FROM calls_df")
+    con.unregister("calls_df")
+    return con
+
+@st.cache_data
+def filter_data(rango_fechas, turno_sel, cat_sel, agente_sel):
+    consulta = """
+        SELECT * FROM calls
+        WHERE fecha BETWEEN ? AND ?
+          AND (? = 'Todos' OR turno = ?)
+          AND (? = 'Todas' OR categoria_llamada = ?)
+          AND (? = 'Todos' OR nombre_agente = ?)
+    """
+    params = [rango_fechas[0], rango_fechas[1], turno_sel, turno_sel, cat_sel, cat_sel, agente_sel, agente_sel]
+    return _conexion().cursor().execute(consulta, params).df()
+
+@st.cache_data
+def compute_kpis(rango_fechas, turno_sel, cat_sel, agente_sel):
+    df_f = filter_data(rango_fechas, turno_sel, cat_sel, agente_sel)
+    return df_f[["score_qa", "score_satisfaccion", "tasa_error_pct"]].mean()
+
+@st.cache_data
+def compute_por_agente(rango_fechas, turno_sel, cat_sel, agente_sel):
+    df_f = filter_data(rango_fechas, turno_sel, cat_sel, agente_sel)
+    return df_f.groupby("nombre_agente", observed=True, sort=False).agg(score_qa=("score_qa","mean"), tasa_error=("tasa_error_pct","mean"), llamadas=("llamadas_por_turno","sum"))
+
+@st.cache_data
+def compute_volumen_mes(rango_fechas, turno_sel, cat_sel, agente_sel):
+    df_f = filter_data(rango_fechas, turno_sel, cat_sel, agente_sel)
+    return df_f.groupby("mes_nombre", observed=True, sort=False)["llamadas_por_turno"].sum().sort_index()
+
+@st.cache_data
+def compute_heatmap(rango_fechas, turno_sel, cat_sel, agente_sel):
+    df_f = filter_data(rango_fechas, turno_sel, cat_sel, agente_sel)
+    heat = df_f.groupby(["turno", "categoria_llamada"], observed=True, sort=False)["score_satisfaccion"].mean().unstack("categoria_llamada").round(1)
+    turnos = df_f["turno"].cat.categories.rename("turno")
+    cats = df_f["categoria_llamada"].cat.categories.rename("categoria_llamada")
+    return heat.reindex(index=turnos[turnos.isin(heat.index)], columns=cats[cats.isin(heat.columns)])
+
+@st.cache_data
+def compute_box(rango_fechas, turno_sel, cat_sel, agente_sel):
+    df_f = filter_data(rango_fechas, turno_sel, cat_sel, agente_sel)
+    if df_f.empty:
+        return pd.DataFrame(columns=["q1", "median", "q3", "lowerfence", "upperfence"]), df_f[["dia_semana", "score_qa"]]
+    box = df_f.groupby("dia_semana", observed=True, sort=False)["score_qa"].quantile([0.25, 0.5, 0.75]).unstack().sort_index()
+    box.columns = ["q1", "median", "q3"]
+    iqr = box["q3"] - box["q1"]
+    dias = df_f["dia_semana"].astype(str)
+    scores = df_f["score_qa"]
+    dentro = (scores >= dias.map(box["q1"] - 1.5 * iqr)) & (scores <= dias.map(box["q3"] + 1.5 * iqr))
+    box["lowerfence"] = scores[dentro].groupby(df_f["dia_semana"][dentro], observed=True, sort=False).min()
+    box["upperfence"] = scores[dentro].groupby(df_f["dia_semana"][dentro], observed=True, sort=False).max()
+    atipicos = df_f.loc[~dentro.values, ["dia_semana", "score_qa"]]
+    return box, atipicos
+
+@st.cache_data
+def sidebar_options(_df):
+    return {
+        "turnos":  ["Todos"] + sorted(_df["turno"].cat.categories.tolist()),
+        "cats":    ["Todas"] + sorted(_df["categoria_llamada"].cat.categories.tolist()),
+        "agentes": ["Todos"] + sorted(_df["nombre_agente"].cat.categories.tolist()),
+    }
+
 df = load_data()
+opciones = sidebar_options(df)
+
+layout_oscuro = {"plot_bgcolor": "#0e1117", "paper_bgcolor": "#0e1117", "font_color": "white", "uirevision": "static"}
+colores = qualitative.Plotly
 
 st.title("QA Call Center Performance Dashboard")
 st.markdown(
@@ -107,61 +203,61 @@ fecha_min = df["fecha"].min()
 fecha_max = df["fecha"].max()
 rango_fechas = st.sidebar.date_input("Rango de fechas", value=(fecha_min, fecha_max), min_value=fecha_min, max_value=fecha_max)
 
-turnos_disponibles = ["Todos"] + sorted(df["turno"].unique().tolist())
-turno_sel = st.sidebar.selectbox("Turno", turnos_disponibles)
+turno_sel = st.sidebar.selectbox("Turno", opciones["turnos"])
 
-cats_disponibles = ["Todas"] + sorted(df["categoria_llamada"].unique().tolist())
-cat_sel = st.sidebar.selectbox("Categoria", cats_disponibles)
+cat_sel = st.sidebar.selectbox("Categoria", opciones["cats"])
 
-agentes_disponibles = ["Todos"] + sorted(df["nombre_agente"].unique().tolist())
-agente_sel = st.sidebar.selectbox("Agente", agentes_disponibles)
+agente_sel = st.sidebar.selectbox("Agente", opciones["agentes"])
 
-df_f = df[(df["fecha"] >= pd.to_datetime(rango_fechas[0])) & (df["fecha"] <= pd.to_datetime(rango_fechas[1]))]
-if turno_sel != "Todos":
-    df_f = df_f[df_f["turno"] == turno_sel]
-if cat_sel != "Todas":
-    df_f = df_f[df_f["categoria_llamada"] == cat_sel]
-if agente_sel != "Todos":
-    df_f = df_f[df_f["nombre_agente"] == agente_sel]
+filtros = (tuple(rango_fechas), turno_sel, cat_sel, agente_sel)
+df_f = filter_data(*filtros)
 
+kpis = compute_kpis(*filtros)
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Total Registros", f"{len(df_f):,}")
-col2.metric("Score QA Promedio", f"{df_f['score_qa'].mean():.1f} / 100")
-col3.metric("Satisfaccion Promedio", f"{df_f['score_satisfaccion'].mean():.1f} / 10")
-col4.metric("Tasa de Error Promedio", f"{df_f['tasa_error_pct'].mean():.1f}%")
+col2.metric("Score QA Promedio", f"{kpis['score_qa']:.1f} / 100")
+col3.metric("Satisfaccion Promedio", f"{kpis['score_satisfaccion']:.1f} / 10")
+col4.metric("Tasa de Error Promedio", f"{kpis['tasa_error_pct']:.1f}%")
 st.divider()
 
+ag = compute_por_agente(*filtros)
+
 st.subheader("Score QA promedio por agente")
-qa_ag = df_f.groupby("nombre_agente")["score_qa"].mean().reset_index().sort_values("score_qa", ascending=False)
-fig1 = px.bar(qa_ag, x="nombre_agente", y="score_qa", color="score_qa", color_continuous_scale="teal", text_auto=".1f", labels={"nombre_agente": "Agente", "score_qa": "Score QA"})
-fig1.update_layout(plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white", coloraxis_showscale=False)
+qa = ag["score_qa"].sort_values(ascending=False)
+fig1 = go.Figure(go.Bar(x=qa.index.astype(str), y=qa.values, marker={"color": qa.values, "colorscale": "teal"}, texttemplate="%{y:.1f}", textposition="auto", hovertemplate="Agente=%{x}<br>Score QA=%{y}<extra></extra>"))
+fig1.update_layout(layout_oscuro, xaxis_title="Agente", yaxis_title="Score QA")
 st.plotly_chart(fig1, use_container_width=True)
 
 st.subheader("Tasa de error vs Score QA por agente")
-sc_data = df_f.groupby("nombre_agente").agg(score_qa=("score_qa","mean"), tasa_error=("tasa_error_pct","mean"), llamadas=("llamadas_por_turno","sum")).reset_index()
-fig2 = px.scatter(sc_data, x="score_qa", y="tasa_error", size="llamadas", color="nombre_agente", text="nombre_agente", labels={"score_qa":"Score QA","tasa_error":"Tasa de Error (%)","nombre_agente":"Agente"})
-fig2.update_traces(textposition="top center")
-fig2.update_layout(plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white")
+fig2 = go.Figure()
+sizeref = 2 * ag["llamadas"].max() / 20 ** 2 if len(ag) else 1
+for i, (agente, fila) in enumerate(ag.sort_index().iterrows()):
+    fig2.add_trace(go.Scatter(x=[fila["score_qa"]], y=[fila["tasa_error"]], mode="markers+text", text=[agente], textposition="top center", name=agente, marker={"size": [fila["llamadas"]], "sizemode": "area", "sizeref": sizeref, "color": colores[i % len(colores)]}, hovertemplate="Agente=%{text}<br>Score QA=%{x}<br>Tasa de Error (%)=%{y}<br>llamadas=%{marker.size}<extra></extra>"))
+fig2.update_layout(layout_oscuro, xaxis_title="Score QA", yaxis_title="Tasa de Error (%)", legend_title_text="Agente")
 st.plotly_chart(fig2, use_container_width=True)
 
 st.subheader("Volumen de llamadas por mes")
-meses_nombre = {1:"Ene",2:"Feb",3:"Mar",4:"Abr",5:"May",6:"Jun",7:"Jul",8:"Ago",9:"Sep",10:"Oct",11:"Nov",12:"Dic"}
-vol_mes = df_f.groupby("mes")["llamadas_por_turno"].sum().reset_index()
-vol_mes["mes_nombre"] = vol_mes["mes"].map(meses_nombre)
-fig3 = px.line(vol_mes, x="mes_nombre", y="llamadas_por_turno", markers=True, labels={"mes_nombre":"Mes","llamadas_por_turno":"Total Llamadas"})
-fig3.update_traces(line_color="#00b4d8", marker_color="#90e0ef")
-fig3.update_layout(plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white")
+vol_mes = compute_volumen_mes(*filtros)
+fig3 = go.Figure(go.Scatter(x=vol_mes.index.astype(str), y=vol_mes.values, mode="lines+markers", line_color="#00b4d8", marker_color="#90e0ef", hovertemplate="Mes=%{x}<br>Total Llamadas=%{y}<extra></extra>"))
+fig3.update_layout(layout_oscuro, xaxis_title="Mes", yaxis_title="Total Llamadas")
 st.plotly_chart(fig3, use_container_width=True)
 
 st.subheader("Satisfaccion promedio por turno y categoria")
-heat = df_f.pivot_table(values="score_satisfaccion", index="turno", columns="categoria_llamada", aggfunc="mean").round(1)
-fig4 = px.imshow(heat, color_continuous_scale="RdYlGn", aspect="auto", text_auto=True, labels={"color":"Score"})
-fig4.update_layout(plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white")
+heat = compute_heatmap(*filtros)
+fig4 = go.Figure(go.Heatmap(z=heat.values, x=heat.columns.astype(str), y=heat.index.astype(str), colorscale="RdYlGn", text=heat.values, texttemplate="%{text}", colorbar_title_text="Score", hovertemplate="categoria_llamada: %{x}<br>turno: %{y}<br>Score: %{z}<extra></extra>"))
+fig4.update_layout(layout_oscuro, xaxis_title="categoria_llamada", yaxis_title="turno", yaxis_autorange="reversed")
 st.plotly_chart(fig4, use_container_width=True)
 
 st.subheader("Distribucion de Score QA por dia de la semana")
-fig5 = px.box(df_f, x="dia_semana", y="score_qa", color="dia_semana", category_orders={"dia_semana":["Lun","Mar","Mie","Jue","Vie","Sab","Dom"]}, labels={"dia_semana":"Dia","score_qa":"Score QA"})
-fig5.update_layout(plot_bgcolor="#0e1117", paper_bgcolor="#0e1117", font_color="white", showlegend=False)
+box, atipicos = compute_box(*filtros)
+fig5 = go.Figure()
+for i, (dia, fila) in enumerate(box.iterrows()):
+    color = colores[i % len(colores)]
+    fig5.add_trace(go.Box(x=[dia], q1=[fila["q1"]], median=[fila["median"]], q3=[fila["q3"]], lowerfence=[fila["lowerfence"]], upperfence=[fila["upperfence"]], name=dia, marker_color=color))
+    puntos = atipicos.loc[atipicos["dia_semana"] == dia, "score_qa"]
+    if len(puntos):
+        fig5.add_trace(go.Scatter(x=[dia] * len(puntos), y=puntos.values, mode="markers", name=dia, marker_color=color))
+fig5.update_layout(layout_oscuro, showlegend=False, xaxis_title="Dia", yaxis_title="Score QA", xaxis={"categoryorder":"array", "categoryarray":df["dia_semana"].cat.categories.tolist()})
 st.plotly_chart(fig5, use_container_width=True)
 
 st.divider()